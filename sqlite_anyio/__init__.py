@@ -1,5 +1,9 @@
+from .pool import SQLitePool as SQLitePool
+from .pool import create_pool as create_pool
+from .sqlite import DEFAULT_PRAGMAS as DEFAULT_PRAGMAS
 from .sqlite import Connection as Connection
 from .sqlite import Cursor as Cursor
+from .sqlite import Driver as Driver
 from .sqlite import connect as connect
 from .sqlite import exception_logger as exception_logger
 
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+__all__ = ["SQLitePool", "create_pool"]
+
+import sqlite3
+from collections.abc import AsyncIterator, Callable, Mapping
+from contextlib import asynccontextmanager, suppress
+from logging import Logger
+from types import TracebackType
+from typing import Optional
+
+from anyio import (
+    CancelScope,
+    ClosedResourceError,
+    EndOfStream,
+    create_memory_object_stream,
+    create_task_group,
+)
+from anyio.streams.memory import MemoryObjectReceiveStream, MemoryObjectSendStream
+
+from .sqlite import DEFAULT_PRAGMAS, Connection, Driver, _Database, connect
+
+
+class SQLitePool:
+    """A pool of reader connections and a single writer connection to the same database.
+
+    Read-only work should go through ``acquire(readonly=True)``, which hands out one of the
+    reader connections (opened with ``PRAGMA query_only=true``), so that concurrent readers
+    don't wait on each other. Writes go through ``acquire(readonly=False)``, which hands out
+    the writer connection. The PRAGMAs and the ``setup`` hook are applied once per connection,
+    when the pool is opened, not on every acquire.
+    """
+
+    def __init__(
+        self,
+        database: _Database,
+        readers: int = 4,
+        writer: bool = True,
+        pragmas: Mapping[str, str] | None = None,
+        uri: bool | None = None,
+        exception_handler: Callable[[type[BaseException], BaseException, TracebackType, Logger], bool] | None = None,
+        log: Logger | None = None,
+        cached_statements: int = 128,
+        driver: Driver = sqlite3,
+        setup: Callable[[sqlite3.Connection], None] | None = None,
+    ) -> None:
+        if readers < 0:
+            raise ValueError("readers must be a non-negative integer")
+        if not readers and not writer:
+            raise ValueError("a pool needs at least one connection")
+        self._database = database
+        self._readers = readers
+        self._writer = writer
+        self._pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self._uri = uri
+        self._exception_handler = exception_handler
+        self._log = log
+        self._cached_statements = cached_statements
+        self._driver = driver
+        self._setup = setup
+        self._connections: list[Connection] = []
+        self._reader_send: MemoryObjectSendStream[Connection | None] | None = None
+        self._reader_receive: MemoryObjectReceiveStream[Connection | None] | None = None
+        self._writer_send: MemoryObjectSendStream[Connection | None] | None = None
+        self._writer_receive: MemoryObjectReceiveStream[Connection | None] | None = None
+
+    async def __aenter__(self) -> SQLitePool:
+        await self.open()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        await self.close()
+
+    async def _connect(self, query_only: bool) -> Connection:
+        pragmas = {**self._pragmas, "query_only": "true"} if query_only else self._pragmas
+        connection = await connect(
+            self._database,
+            self._uri,
+            self._exception_handler,
+            self._log,
+            cached_statements=self._cached_statements,
+            pragmas=pragmas,
+            driver=self._driver,
+            setup=self._setup,
+        )
+        self._connections.append(connection)
+        return connection
+
+    async def open(self) -> None:
+        """Open the writer connection, then the reader connections."""
+        if self._connections:
+            raise RuntimeError("the pool is already open")
+        try:
+            # the writer goes first, so that e.g. the WAL journal mode is in place for the readers
+            if self._writer:
+                self._writer_send, self._writer_receive = create_memory_object_stream[Optional[Connection]](1)
+                self._writer_send.send_nowait(await self._connect(query_only=False))
+            if self._readers:
+                self._reader_send, self._reader_receive = create_memory_object_stream[Optional[Connection]](self._readers)
+                for _ in range(self._readers):
+                    self._reader_send.send_nowait(await self._connect(query_only=True))
+        except BaseException:
+            await self.close()
+            raise
+
+    async def close(self) -> None:
+        """Close all the connections of the pool."""
+        connections, self._connections = self._connections, []
+        for stream in (self._reader_send, self._reader_receive, self._writer_send, self._writer_receive):
+            if stream is not None:
+                stream.close()
+        self._reader_send = self._reader_receive = self._writer_send = self._writer_receive = None
+        # the connections don't share a lock, close them all at once
+        async with create_task_group() as tg:
+            for connection in connections:
+                tg.start_soon(connection.close)
+
+    @asynccontextmanager
+    async def acquire(self, readonly: bool = True) -> AsyncIterator[Connection]:
+        """Borrow a connection from the pool, and give it back on exit.
+
+        A pending transaction is rolled back before the connection is returned to the pool.
+        Raises ``RuntimeError`` if the pool is not open, or gets closed while waiting.
+        """
+        if readonly and self._reader_receive is not None:
+            send, receive = self._reader_send, self._reader_receive
+        elif self._writer_receive is not None:
+            send, receive = self._writer_send, self._writer_receive
+        elif self._connections:
+            raise RuntimeError("the pool has no writer connection")
+        else:
+            raise RuntimeError("the pool is not open")
+
+        assert send is not None
+        query_only = send is self._reader_send
+        try:
+            connection = await receive.receive()
+        except (EndOfStream, ClosedResourceError):
+            raise RuntimeError("the pool is not open") from None
+        if connection is None:
+            # the slot's previous connection was retired, open its replacement
+            try:
+                connection = await self._connect(query_only)
+            except BaseException:
+                with suppress(ClosedResourceError):
+                    send.send_nowait(None)
+                raise
+            if send not in (self._reader_send, self._writer_send):
+                # the pool was closed while connecting
+                self._connections.remove(connection)
+                await connection.close()
+                raise RuntimeError("the pool is not open")
+        try:
+            yield connection
+        finally:
+            # the pool may have been closed (along with its connections) in the meantime
+            if connection in self._connections:
+                # the borrower may have been cancelled, but the connection must be cleaned up anyway
+                with CancelScope(shield=True):
+                    await self._release(connection, send)
+
+    async def _release(self, connection: Connection, send: MemoryObjectSendStream[Connection | None]) -> None:
+        try:
+            if connection._real_connection.in_transaction:
+                await connection.rollback()
+        except Exception:
+            # don't hand out a connection in an unknown state: retire it, and keep its slot
+            # so that the next acquire opens a new connection
+            connection._log.warning("Retiring pooled connection after a failed rollback", exc_info=True)
+            self._connections.remove(connection)
+            with suppress(Exception):
+                await connection.close()
+            send.send_nowait(None)
+        else:
+            send.send_nowait(connection)
+
+
+async def create_pool(
+    database: _Database,
+    readers: int = 4,
+    writer: bool = True,
+    pragmas: Mapping[str, str] | None = None,
+    uri: bool | None = None,
+    exception_handler: Callable[[type[BaseException], BaseException, TracebackType, Logger], bool] | None = None,
+    log: Logger | None = None,
+    cached_statements: int = 128,
+    driver: Driver = sqlite3,
+    setup: Callable[[sqlite3.Connection], None] | None = None,
+) -> SQLitePool:
+    """Create a connection pool and open its connections."""
+    pool = SQLitePool(
+        database, readers, writer, pragmas, uri, exception_handler, log, cached_statements, driver, setup
+    )
+    await pool.open()
+    return pool
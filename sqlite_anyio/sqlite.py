@@ -1,15 +1,44 @@
 from __future__ import annotations
 
-__all__ = ["connect", "Connection", "Cursor"]
+__all__ = ["connect", "Connection", "Cursor", "DEFAULT_PRAGMAS", "Driver"]
 
+import os
 import sqlite3
-from collections.abc import Callable, Sequence
-from functools import partial, update_wrapper
+import sys
+from collections.abc import AsyncIterator, Callable, Iterable, Mapping, Sequence
+from functools import update_wrapper
+from itertools import islice
 from logging import Logger, getLogger
 from types import TracebackType
-from typing import Any
+from typing import TYPE_CHECKING, Any, Protocol, TypeVar, Union
+from urllib.parse import parse_qs, urlsplit
 
 from anyio import CapacityLimiter, to_thread
+from anyio.lowlevel import checkpoint
+
+if TYPE_CHECKING:
+    import numpy
+
+DEFAULT_PRAGMAS = {"journal_mode": "wal", "synchronous": "normal", "temp_store": "memory", "cache_size": "-64000"}
+
+# NumPy dtypes for columns whose values are all of the same SQLite storage class
+_NUMPY_DTYPES = {int: "int64", float: "float64"}
+
+# upper bound on the batch size when iterating over a cursor
+_MAX_FETCH_SIZE = 65536
+
+T = TypeVar("T")
+
+# what sqlite3.connect accepts as a database
+_Database = Union[str, bytes, "os.PathLike[str]", "os.PathLike[bytes]"]
+
+
+class Driver(Protocol):
+    """A module implementing the ``sqlite3`` API, such as ``sqlite3`` itself or ``pysqlite3.dbapi2``."""
+
+    def connect(
+        self, database: _Database, *, uri: bool, cached_statements: int, check_same_thread: bool
+    ) -> sqlite3.Connection: ...
 
 
 class Connection:
@@ -18,11 +47,26 @@ class Connection:
         _real_connection: sqlite3.Connection,
         _exception_handler: Callable[[type[BaseException], BaseException, TracebackType, Logger], bool] | None = None,
         _log: Logger | None = None,
+        _sync_ok: bool = False,
     ) -> None:
         self._real_connection = _real_connection
         self._exception_handler = _exception_handler
         self._log = _log or getLogger(__name__)
         self._limiter = CapacityLimiter(1)
+        self._sync_ok = _sync_ok
+        self._close = _real_connection.close
+        self._commit = _real_connection.commit
+        self._rollback = _real_connection.rollback
+        self._cursor = _real_connection.cursor
+        self._execute = _real_connection.execute
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        if self._sync_ok:
+            # in-memory databases don't block on I/O, a thread hop would cost more than the call itself;
+            # the call runs entirely in the event loop thread, so it cannot interleave with another one
+            await checkpoint()
+            return func(*args)
+        return await to_thread.run_sync(func, *args, limiter=self._limiter)
 
     async def __aenter__(self) -> Connection:
         return self
@@ -34,42 +78,158 @@ class Connection:
         exc_tb: TracebackType | None,
     ) -> bool | None:
         if exc_val is None:
-            await self.commit()  # type: ignore[call-arg]
+            await self.commit()
             return None
 
         assert exc_type is not None
         assert exc_val is not None
         assert exc_tb is not None
-        await self.rollback()  # type: ignore[call-arg]
+        await self.rollback()
         exception_handled = False
         if self._exception_handler is not None:
             exception_handled = self._exception_handler(exc_type, exc_val, exc_tb, self._log)
         return exception_handled
 
-    async def close(self):
-        return await to_thread.run_sync(self._real_connection.close, limiter=self._limiter)
-
-    update_wrapper(close, sqlite3.Connection.close)
-
-    async def commit(self):
-        return await to_thread.run_sync(self._real_connection.commit, limiter=self._limiter)
+    async def close(self) -> None:
+        return await self._run(self._close)
 
-    update_wrapper(commit, sqlite3.Connection.commit)
+    async def commit(self) -> None:
+        return await self._run(self._commit)
 
-    async def rollback(self):
-        return await to_thread.run_sync(self._real_connection.rollback, limiter=self._limiter)
+    async def rollback(self) -> None:
+        return await self._run(self._rollback)
 
-    update_wrapper(rollback, sqlite3.Connection.rollback)
+    async def cursor(self, factory: Callable[[sqlite3.Connection], sqlite3.Cursor] | None = None) -> Cursor:
+        # without a factory, let the driver use its own cursor type
+        if factory is None:
+            real_cursor = await self._run(self._cursor)
+        else:
+            real_cursor = await self._run(self._cursor, factory)
+        return Cursor(real_cursor, self)
 
-    async def cursor(self, factory: Callable[[sqlite3.Connection], sqlite3.Cursor] = sqlite3.Cursor) -> Cursor:
-        real_cursor = await to_thread.run_sync(self._real_connection.cursor, factory, limiter=self._limiter)
-        return Cursor(real_cursor, self._limiter)
+    async def execute(self, sql: str, parameters: Sequence[Any] = (), /) -> Cursor:
+        real_cursor = await self._run(self._execute, sql, parameters)
+        return Cursor(real_cursor, self)
+
+    async def execute_fetchone(self, sql: str, parameters: Sequence[Any] = (), /) -> tuple[Any, ...] | None:
+        """Execute ``sql`` and fetch the first row of the result, in a single worker thread call."""
+        return await self._run(self._execute_fetchone, sql, parameters)
+
+    def _execute_fetchone(self, sql: str, parameters: Sequence[Any]) -> tuple[Any, ...] | None:
+        real_cursor = self._execute(sql, parameters)
+        try:
+            return real_cursor.fetchone()
+        finally:
+            real_cursor.close()
+
+    async def execute_fetchall(self, sql: str, parameters: Sequence[Any] = (), /) -> list[tuple[Any, ...]]:
+        """Execute ``sql`` and fetch all the rows of the result, in a single worker thread call."""
+        return await self._run(self._execute_fetchall, sql, parameters)
+
+    def _execute_fetchall(self, sql: str, parameters: Sequence[Any]) -> list[tuple[Any, ...]]:
+        real_cursor = self._execute(sql, parameters)
+        try:
+            return real_cursor.fetchall()
+        finally:
+            real_cursor.close()
+
+    async def executemany_batched(
+        self, sql: str, parameters: Iterable[Sequence[Any]], /, chunk: int = 10_000
+    ) -> int:
+        """Execute ``sql`` for every item of ``parameters`` in a single transaction.
+
+        The parameters are passed to ``sqlite3.Cursor.executemany`` ``chunk`` rows at a time,
+        all in one worker thread call. If no transaction is pending, the whole batch is wrapped
+        in ``BEGIN``/``COMMIT``, and rolled back on error. Returns the total number of rows
+        modified across all the chunks.
+        """
+        if chunk < 1:
+            raise ValueError("chunk must be a positive integer")
+        return await self._run(self._executemany_batched, sql, parameters, chunk)
+
+    def _executemany_batched(self, sql: str, parameters: Iterable[Sequence[Any]], chunk: int) -> int:
+        def executemany(real_cursor: sqlite3.Cursor) -> int:
+            rowcount = 0
+            rows = iter(parameters)
+            while batch := list(islice(rows, chunk)):
+                real_cursor.executemany(sql, batch)
+                rowcount += real_cursor.rowcount
+            return rowcount
+
+        return self._run_in_transaction(executemany, "BEGIN")
+
+    async def execute_batch(self, statements: Iterable[tuple[str, Sequence[Any]]], /) -> Cursor:
+        """Execute the ``(sql, parameters)`` statements in a single transaction.
+
+        The statements are all run in one worker thread call, on a new cursor. If no transaction
+        is pending, they are wrapped in ``BEGIN IMMEDIATE``/``COMMIT``, and rolled back on error.
+        The returned cursor holds the results of the last statement.
+        """
+        real_cursor = await self._run(self._execute_batch, statements)
+        return Cursor(real_cursor, self)
+
+    def _execute_batch(self, statements: Iterable[tuple[str, Sequence[Any]]]) -> sqlite3.Cursor:
+        statements = list(statements)
+        if (
+            len(statements) > 1
+            and not self._real_connection.in_transaction
+            and not any(parameters for _, parameters in statements)
+        ):
+            # without parameters, let sqlite3_exec() run all but the last statement as a script,
+            # the last one is executed on the cursor so that its results can be fetched
+            real_cursor = self._real_connection.cursor()
+            # a newline before each separator, so that a trailing "--" comment doesn't swallow it
+            script = "\n;\n".join(["BEGIN IMMEDIATE", *(sql for sql, _ in statements[:-1])]) + "\n;"
+            try:
+                real_cursor.executescript(script)
+                real_cursor.execute(statements[-1][0])
+            except BaseException:
+                if self._real_connection.in_transaction:
+                    self._real_connection.rollback()
+                raise
+            self._real_connection.commit()
+            return real_cursor
+
+        def execute(real_cursor: sqlite3.Cursor) -> sqlite3.Cursor:
+            for sql, parameters in statements:
+                real_cursor.execute(sql, parameters)
+            return real_cursor
+
+        return self._run_in_transaction(execute, "BEGIN IMMEDIATE")
+
+    def _run_in_transaction(self, func: Callable[[sqlite3.Cursor], T], begin: str) -> T:
+        # only manage the transaction if the caller hasn't started one already
+        real_cursor = self._real_connection.cursor()
+        owned = not self._real_connection.in_transaction
+        if owned:
+            real_cursor.execute(begin)
+        try:
+            result = func(real_cursor)
+        except BaseException:
+            if owned:
+                self._real_connection.rollback()
+            raise
+        if owned:
+            self._real_connection.commit()
+        return result
 
 
 class Cursor:
-    def __init__(self, real_cursor: sqlite3.Cursor, limiter: CapacityLimiter) -> None:
+    def __init__(self, real_cursor: sqlite3.Cursor, connection: Connection) -> None:
         self._real_cursor = real_cursor
-        self._limiter = limiter
+        self._connection = connection
+        self._run = connection._run
+        self._execute = real_cursor.execute
+        self._executemany = real_cursor.executemany
+        self._executescript = real_cursor.executescript
+        self._close = real_cursor.close
+        self._fetchone = real_cursor.fetchone
+        self._fetchmany = real_cursor.fetchmany
+        self._fetchall = real_cursor.fetchall
+
+    def _wrap(self, real_cursor: sqlite3.Cursor) -> Cursor:
+        # sqlite3.Cursor.execute* return the cursor itself, don't allocate a new wrapper for it
+        return self if real_cursor is self._real_cursor else Cursor(real_cursor, self._connection)
 
     @property
     def description(self) -> Any:
@@ -84,54 +244,140 @@ class Cursor:
         return self._real_cursor.arraysize
 
     async def close(self) -> None:
-        await to_thread.run_sync(self._real_cursor.close, limiter=self._limiter)
-
-    update_wrapper(close, sqlite3.Cursor.close)
+        await self._run(self._close)
 
     async def execute(self, sql: str, parameters: Sequence[Any] = (), /) -> Cursor:
-        real_cursor = await to_thread.run_sync(self._real_cursor.execute, sql, parameters, limiter=self._limiter)
-        return Cursor(real_cursor, self._limiter)
-
-    update_wrapper(execute, sqlite3.Cursor.execute)
+        real_cursor = await self._run(self._execute, sql, parameters)
+        return self._wrap(real_cursor)
 
     async def executemany(self, sql: str, parameters: Sequence[Any], /) -> Cursor:
-        real_cursor = await to_thread.run_sync(self._real_cursor.executemany, sql, parameters, limiter=self._limiter)
-        return Cursor(real_cursor, self._limiter)
-
-    update_wrapper(executemany, sqlite3.Cursor.executemany)
+        real_cursor = await self._run(self._executemany, sql, parameters)
+        return self._wrap(real_cursor)
 
     async def executescript(self, sql_script: str, /) -> Cursor:
-        real_cursor = await to_thread.run_sync(self._real_cursor.executescript, sql_script, limiter=self._limiter)
-        return Cursor(real_cursor, self._limiter)
-
-    update_wrapper(executescript, sqlite3.Cursor.executescript)
+        real_cursor = await self._run(self._executescript, sql_script)
+        return self._wrap(real_cursor)
+
+    async def __aiter__(self) -> AsyncIterator[tuple[Any, ...]]:
+        """Iterate over the remaining rows, fetching them in batches.
+
+        The first batch has ``arraysize`` rows, and every following batch is twice as big
+        as the previous one, up to 65536 rows.
+        """
+        size = self.arraysize
+        while rows := await self.fetchmany(size):
+            for row in rows:
+                yield row
+            if size < _MAX_FETCH_SIZE:
+                size = min(size * 2, _MAX_FETCH_SIZE)
 
     async def fetchone(self) -> tuple[Any, ...] | None:
-        return await to_thread.run_sync(self._real_cursor.fetchone, limiter=self._limiter)
-
-    update_wrapper(fetchone, sqlite3.Cursor.fetchone)
+        return await self._run(self._fetchone)
 
     async def fetchmany(self, size: int) -> list[tuple[Any, ...]]:
-        return await to_thread.run_sync(self._real_cursor.fetchmany, size, limiter=self._limiter)
-
-    update_wrapper(fetchmany, sqlite3.Cursor.fetchmany)
+        return await self._run(self._fetchmany, size)
 
     async def fetchall(self) -> list[tuple[Any, ...]]:
-        return await to_thread.run_sync(self._real_cursor.fetchall, limiter=self._limiter)
-
-    update_wrapper(fetchall, sqlite3.Cursor.fetchall)
+        return await self._run(self._fetchall)
+
+    async def fetchall_into(self, out: list[tuple[Any, ...]] | None = None, /) -> list[tuple[Any, ...]]:
+        """Fetch all remaining rows, appending them to ``out`` if given, and return the list.
+
+        The rows are appended straight from the cursor in the worker thread, without building an
+        intermediate list. Without ``out``, this is the same as ``fetchall()``.
+        """
+        return await self._run(self._fetchall_into, out)
+
+    def _fetchall_into(self, out: list[tuple[Any, ...]] | None) -> list[tuple[Any, ...]]:
+        if out is None:
+            return self._fetchall()
+        out.extend(self._real_cursor)
+        return out
+
+    async def fetchall_columns(self) -> dict[str, numpy.ndarray]:
+        """Fetch all remaining rows as a mapping of column names to NumPy arrays.
+
+        The arrays are built in the worker thread. Columns holding only integers or only
+        floats get an ``int64`` or ``float64`` array, other columns an ``object`` array.
+        Raises ``ValueError`` if several columns have the same name.
+        Requires NumPy (``pip install sqlite-anyio[numpy]``).
+        """
+        return await self._run(self._fetchall_columns)
+
+    def _fetchall_columns(self) -> dict[str, numpy.ndarray]:
+        import numpy
+
+        names = [column[0] for column in self._real_cursor.description or ()]
+        if len(set(names)) != len(names):
+            # checked before fetching, so that the rows are still available on the cursor
+            duplicates = sorted({name for name in names if names.count(name) > 1})
+            raise ValueError(f"Duplicate column names, use aliases to make them unique: {', '.join(duplicates)}")
+        rows = self._real_cursor.fetchall()
+        columns = zip(*rows) if rows else [()] * len(names)
+        arrays = {}
+        for name, values in zip(names, columns):
+            types = set(map(type, values))
+            dtype = _NUMPY_DTYPES.get(types.pop(), object) if len(types) == 1 else object
+            arrays[name] = numpy.array(values, dtype=dtype)
+        return arrays
 
 
 async def connect(
-    database: str,
+    database: _Database,
     uri: bool | None = None,
     exception_handler: Callable[[type[BaseException], BaseException, TracebackType, Logger], bool] | None = None,
     log: Logger | None = None,
+    cached_statements: int = 128,
+    *,
+    pragmas: Mapping[str, str] | None = None,
+    driver: Driver = sqlite3,
+    setup: Callable[[sqlite3.Connection], None] | None = None,
 ) -> Connection:
-    real_connection = await to_thread.run_sync(
-        partial(sqlite3.connect, database, uri=uri, check_same_thread=False)
-    )
-    return Connection(real_connection, exception_handler, log)
+    # checked before opening, so that a failing check doesn't leak the connection
+    sync_ok = _is_memory(database, bool(uri))
+    real_connection = await to_thread.run_sync(_connect, driver, database, bool(uri), cached_statements, pragmas, setup)
+    return Connection(real_connection, exception_handler, log, sync_ok)
+
+
+def _is_memory(database: _Database, uri: bool) -> bool:
+    database = os.fsdecode(database)
+    if database == ":memory:":
+        return True
+    if not uri or not database.startswith("file:"):
+        return False
+    url = urlsplit(database)
+    return url.path == ":memory:" or "memory" in parse_qs(url.query).get("mode", ())
+
+
+def _connect(
+    driver: Driver,
+    database: _Database,
+    uri: bool,
+    cached_statements: int,
+    pragmas: Mapping[str, str] | None,
+    setup: Callable[[sqlite3.Connection], None] | None,
+) -> sqlite3.Connection:
+    # open and configure the connection in the same worker thread call
+    real_connection = driver.connect(database, uri=uri, cached_statements=cached_statements, check_same_thread=False)
+    try:
+        if pragmas:
+            for name, value in pragmas.items():
+                real_connection.execute(f"PRAGMA {name}={value}").close()
+        if setup is not None:
+            setup(real_connection)
+    except BaseException:
+        real_connection.close()
+        raise
+    return real_connection
+
+
+if not sys.flags.optimize:
+    # copy the docstrings of the wrapped sqlite3 methods, once and only when they might be read
+    for _name in ("close", "commit", "rollback", "execute"):
+        update_wrapper(getattr(Connection, _name), getattr(sqlite3.Connection, _name))
+    for _name in ("close", "execute", "executemany", "executescript", "fetchone", "fetchmany", "fetchall"):
+        update_wrapper(getattr(Cursor, _name), getattr(sqlite3.Cursor, _name))
+    del _name
 
 
 def exception_logger(
@@ -0,0 +1,222 @@
+import sqlite3
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import anyio
+import pytest
+import sqlite_anyio
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_executemany_batched(tmp_path):
+    acon = await sqlite_anyio.connect(str(tmp_path / "batch.db"))
+    acur = await acon.cursor()
+    await acur.execute("CREATE TABLE movie(title, year)")
+    rows = ((f"movie{i}", i) for i in range(25))
+    assert await acon.executemany_batched("INSERT INTO movie VALUES(?, ?)", rows, chunk=10) == 25
+    assert not acon._real_connection.in_transaction
+
+    await acur.execute("SELECT COUNT(*) FROM movie")
+    assert await acur.fetchone() == (25,)
+    await acon.close()
+
+
+async def test_executemany_batched_rollback(tmp_path):
+    acon = await sqlite_anyio.connect(str(tmp_path / "batch.db"))
+    acur = await acon.cursor()
+    await acur.execute("CREATE TABLE lang(name VARCHAR UNIQUE)")
+    await acon.commit()
+    with pytest.raises(sqlite3.IntegrityError):
+        await acon.executemany_batched("INSERT INTO lang VALUES(?)", [("Python",), ("C",), ("Python",)], chunk=2)
+    assert not acon._real_connection.in_transaction
+
+    await acur.execute("SELECT COUNT(*) FROM lang")
+    assert await acur.fetchone() == (0,)
+    with pytest.raises(ValueError):
+        await acon.executemany_batched("INSERT INTO lang VALUES(?)", [], chunk=0)
+    await acon.close()
+
+
+@pytest.mark.parametrize("with_parameters", [True, False])
+async def test_execute_batch(tmp_path, with_parameters):
+    acon = await sqlite_anyio.connect(str(tmp_path / "batch.db"))
+    acur = await acon.cursor()
+    await acur.execute("CREATE TABLE lang(name VARCHAR UNIQUE)")
+    await acon.commit()
+    if with_parameters:
+        statements = [("INSERT INTO lang VALUES(?)", ("Python",)), ("INSERT INTO lang VALUES(?)", ("C",))]
+    else:
+        statements = [("INSERT INTO lang VALUES('Python')", ()), ("INSERT INTO lang VALUES('C')", ())]
+    await acon.execute_batch(statements)
+    assert not acon._real_connection.in_transaction
+
+    with pytest.raises(sqlite3.IntegrityError):
+        await acon.execute_batch([("INSERT INTO lang VALUES('Rust')", ()), statements[0]])
+    assert not acon._real_connection.in_transaction
+
+    await acur.execute("SELECT name FROM lang")
+    assert await acur.fetchall() == [("Python",), ("C",)]
+
+    if with_parameters:
+        statements = [("INSERT INTO lang VALUES(?) -- note", ("Rust",)), ("SELECT ? -- note", (42,))]
+    else:
+        statements = [("INSERT INTO lang VALUES('Rust') -- note", ()), ("SELECT 42 -- note", ())]
+    acur = await acon.execute_batch(statements)
+    assert acur.description is not None
+    assert await acur.fetchall() == [(42,)]
+    assert not acon._real_connection.in_transaction
+    assert await acon.execute_fetchall("SELECT name FROM lang") == [("Python",), ("C",), ("Rust",)]
+    await acon.close()
+
+
+async def test_connect_pragmas(tmp_path):
+    acon = await sqlite_anyio.connect(str(tmp_path / "pragmas.db"), pragmas=sqlite_anyio.DEFAULT_PRAGMAS)
+    acur = await acon.cursor()
+    for name, value in [("journal_mode", "wal"), ("synchronous", 1), ("temp_store", 2), ("cache_size", -64000)]:
+        await acur.execute(f"PRAGMA {name}")
+        assert await acur.fetchone() == (value,)
+    await acon.close()
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        await sqlite_anyio.connect(str(tmp_path / "pragmas.db"), pragmas={"journal_mode": "wal; DROP"})
+
+
+@pytest.mark.parametrize(
+    "database,uri,sync_ok",
+    [
+        (":memory:", False, True),
+        ("file::memory:?cache=shared", True, True),
+        ("file:mem?mode=memory&cache=shared", True, True),
+        ("file:mem?mode=memory&cache=shared", False, False),
+        ("file:sqlite.db?mode=rwc", True, False),
+        ("sqlite.db", False, False),
+        (b":memory:", False, True),
+        (b"file::memory:", True, True),
+        (Path(":memory:"), False, True),
+        (Path("sqlite.db"), False, False),
+        (Path("sqlite.db"), True, False),
+        (Path("file:sqlite.db?mode=rwc"), True, False),
+    ],
+)
+async def test_connect_in_memory(tmp_path, monkeypatch, database, uri, sync_ok):
+    monkeypatch.chdir(tmp_path)
+    acon = await sqlite_anyio.connect(database, uri=uri)
+    assert acon._sync_ok is sync_ok
+    await acon.close()
+
+
+async def test_connect_driver(tmp_path):
+    databases = []
+
+    def connect(database, **kwargs):
+        databases.append(database)
+        return sqlite3.connect(database, **kwargs)
+
+    database = str(tmp_path / "driver.db")
+    acon = await sqlite_anyio.connect(database, driver=SimpleNamespace(connect=connect))
+    acur = await acon.cursor()
+    await acur.execute("SELECT 1")
+    assert await acur.fetchone() == (1,)
+    await acon.close()
+    assert databases == [database]
+
+
+class ForeignConnection:
+    """A connection of another driver, whose cursor type is not sqlite3.Cursor."""
+
+    def __init__(self, real_connection):
+        self._real_connection = real_connection
+
+    def __getattr__(self, name):
+        return getattr(self._real_connection, name)
+
+    def cursor(self, *args):
+        if args:
+            raise TypeError("factory must return a cursor, not object")
+        return self._real_connection.cursor()
+
+
+async def test_connect_foreign_driver(tmp_path):
+    driver = SimpleNamespace(connect=lambda database, **kwargs: ForeignConnection(sqlite3.connect(database, **kwargs)))
+    acon = await sqlite_anyio.connect(str(tmp_path / "driver.db"), driver=driver)
+    acur = await acon.cursor()
+    await acur.execute("SELECT 1")
+    assert await acur.fetchone() == (1,)
+    # an explicit factory is still passed through to the driver
+    with pytest.raises(TypeError):
+        await acon.cursor(sqlite3.Cursor)
+    await acon.close()
+
+    async with sqlite_anyio.SQLitePool(str(tmp_path / "driver.db"), readers=1, driver=driver) as pool:
+        async with pool.acquire() as acon:
+            acur = await acon.cursor()
+            await acur.execute("PRAGMA query_only")
+            assert await acur.fetchone() == (1,)
+
+
+async def test_connection_execute(tmp_path):
+    acon = await sqlite_anyio.connect(str(tmp_path / "execute.db"))
+    acur = await acon.execute("CREATE TABLE lang(name)")
+    assert isinstance(acur, sqlite_anyio.Cursor)
+    await acon.execute("INSERT INTO lang VALUES(?)", ("Python",))
+    await acon.execute("INSERT INTO lang VALUES(?)", ("C",))
+    assert await acon.execute_fetchone("SELECT name FROM lang WHERE name = ?", ("C",)) == ("C",)
+    assert await acon.execute_fetchone("SELECT name FROM lang WHERE name = ?", ("Rust",)) is None
+    assert await acon.execute_fetchall("SELECT name FROM lang") == [("Python",), ("C",)]
+    await acon.close()
+
+
+async def test_connect_setup(tmp_path):
+    def setup(connection):
+        connection.create_function("double", 1, lambda value: value * 2)
+
+    acon = await sqlite_anyio.connect(str(tmp_path / "setup.db"), setup=setup)
+    assert await acon.execute_fetchone("SELECT double(21)") == (42,)
+    await acon.close()
+
+    def failing_setup(connection):
+        raise RuntimeError("foo")
+
+    with pytest.raises(RuntimeError):
+        await sqlite_anyio.connect(str(tmp_path / "setup.db"), setup=failing_setup)
+
+
+async def test_queued_call_cancellation(tmp_path):
+    def setup(connection):
+        connection.create_function("sleep", 1, time.sleep)
+
+    acon = await sqlite_anyio.connect(str(tmp_path / "cancel.db"), setup=setup)
+    await acon.execute("CREATE TABLE lang(name)")
+    await acon.commit()
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(acon.execute_fetchone, "SELECT sleep(0.2)")
+        await anyio.sleep(0.05)
+        with anyio.move_on_after(0.05) as scope:
+            await acon.execute("INSERT INTO lang VALUES(?)", ("Python",))
+        assert scope.cancelled_caught
+
+    await acon.commit()
+    assert await acon.execute_fetchall("SELECT name FROM lang") == []
+    await acon.close()
+
+
+async def test_busy_connection_does_not_starve_others(tmp_path):
+    def setup(connection):
+        connection.create_function("sleep", 1, time.sleep)
+
+    acon0 = await sqlite_anyio.connect(str(tmp_path / "busy.db"), setup=setup)
+    acon1 = await sqlite_anyio.connect(str(tmp_path / "busy.db"))
+    with anyio.move_on_after(0.3):
+        async with anyio.create_task_group() as tg:
+            # more queued calls than anyio's default worker thread limit
+            for _ in range(45):
+                tg.start_soon(acon0.execute_fetchone, "SELECT sleep(0.1)")
+            await anyio.sleep(0.02)
+            with anyio.fail_after(0.2):
+                assert await acon1.execute_fetchone("SELECT 1") == (1,)
+    await acon0.close()
+    await acon1.close()
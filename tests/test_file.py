@@ -31,6 +31,7 @@ async def test_cursor_execute():
     command = "SELECT name FROM sqlite_master"
     res = pytest.cur.execute(command)
     ares = await pytest.acur.execute(command)
+    assert ares is pytest.acur
     assert res.fetchone() == await ares.fetchone() == ("movie",)
 
     command = "SELECT name FROM sqlite_master WHERE name='spam'"
@@ -127,6 +128,48 @@ async def test_fetchmany():
     ]
 
 
+async def test_cursor_aiter():
+    command = "SELECT title FROM movie"
+    res = pytest.cur.execute(command)
+    ares = await pytest.acur.execute(command)
+    assert res.fetchall() == [row async for row in ares]
+
+
+async def test_fetchall_into():
+    command = "SELECT title FROM movie"
+    res = pytest.cur.execute(command)
+    rows = res.fetchall()
+    ares = await pytest.acur.execute(command)
+    assert await ares.fetchall_into() == rows
+    out = [("spam",)]
+    ares = await pytest.acur.execute(command)
+    assert await ares.fetchall_into(out) is out
+    assert out == [("spam",)] + rows
+
+
+async def test_fetchall_columns():
+    res = pytest.cur.execute("SELECT title, year, score FROM movie")
+    titles, years, scores = zip(*res.fetchall())
+    ares = await pytest.acur.execute("SELECT title, year, score FROM movie")
+    columns = await ares.fetchall_columns()
+    assert list(columns) == ["title", "year", "score"]
+    assert columns["title"].dtype == object
+    assert columns["year"].dtype == "int64"
+    assert columns["score"].dtype == "float64"
+    assert columns["title"].tolist() == list(titles)
+    assert columns["year"].tolist() == list(years)
+    assert columns["score"].tolist() == list(scores)
+
+    ares = await pytest.acur.execute("SELECT title FROM movie WHERE year < 0")
+    assert {name: values.tolist() for name, values in (await ares.fetchall_columns()).items()} == {"title": []}
+
+    ares = await pytest.acur.execute("SELECT title, year, title FROM movie")
+    with pytest.raises(ValueError) as excinfo:
+        await ares.fetchall_columns()
+    assert str(excinfo.value) == "Duplicate column names, use aliases to make them unique: title"
+    assert len(await ares.fetchall()) == 4
+
+
 async def test_cursor_executescript():
     script = """
         BEGIN;
@@ -0,0 +1,234 @@
+import anyio
+import pytest
+import sqlite3
+import time
+import sqlite_anyio
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_pool_write_then_read(tmp_path):
+    async with sqlite_anyio.SQLitePool(str(tmp_path / "pool.db"), readers=2) as pool:
+        async with pool.acquire(readonly=False) as acon:
+            async with acon:
+                acur = await acon.cursor()
+                await acur.execute("CREATE TABLE lang(id INTEGER PRIMARY KEY, name VARCHAR UNIQUE)")
+                await acur.execute("INSERT INTO lang(name) VALUES(?)", ("Python",))
+
+        async with pool.acquire() as acon:
+            acur = await acon.cursor()
+            await acur.execute("PRAGMA journal_mode")
+            assert await acur.fetchone() == ("wal",)
+            await acur.execute("SELECT name FROM lang")
+            assert await acur.fetchone() == ("Python",)
+
+
+async def test_pool_readers_are_read_only(tmp_path):
+    async with sqlite_anyio.SQLitePool(str(tmp_path / "pool.db"), readers=1) as pool:
+        async with pool.acquire() as acon:
+            acur = await acon.cursor()
+            with pytest.raises(sqlite3.OperationalError):
+                await acur.execute("CREATE TABLE lang(name)")
+
+
+async def test_pool_concurrent_readers(tmp_path):
+    pool = await sqlite_anyio.create_pool(str(tmp_path / "pool.db"), readers=2, writer=False)
+    acquired = []
+
+    async def read():
+        async with pool.acquire() as acon:
+            acquired.append(acon)
+            await anyio.sleep(0.01)
+
+    async with anyio.create_task_group() as tg:
+        for _ in range(4):
+            tg.start_soon(read)
+
+    assert len(set(acquired)) == 2
+    with pytest.raises(RuntimeError):
+        async with pool.acquire(readonly=False):
+            pass  # pragma: no cover
+    await pool.close()
+
+    with pytest.raises(RuntimeError):
+        async with pool.acquire():
+            pass  # pragma: no cover
+
+
+async def test_pool_rollback_on_release(tmp_path):
+    async with sqlite_anyio.SQLitePool(str(tmp_path / "pool.db"), readers=0) as pool:
+        async with pool.acquire(readonly=False) as acon:
+            acur = await acon.cursor()
+            await acur.execute("CREATE TABLE lang(name)")
+            await acon.commit()
+            await acur.execute("INSERT INTO lang VALUES(?)", ("Python",))
+
+        async with pool.acquire() as acon:
+            acur = await acon.cursor()
+            await acur.execute("SELECT name FROM lang")
+            assert await acur.fetchall() == []
+
+
+async def test_pool_setup(tmp_path):
+    connections = []
+
+    def setup(connection):
+        connections.append(connection)
+        connection.row_factory = sqlite3.Row
+
+    async with sqlite_anyio.SQLitePool(str(tmp_path / "pool.db"), readers=2, setup=setup) as pool:
+        for _ in range(3):
+            async with pool.acquire() as acon:
+                row = await acon.execute_fetchone("SELECT 1 AS one")
+                assert row["one"] == 1
+
+    assert len(connections) == 3
+
+
+async def test_pool_open_errors(tmp_path):
+    with pytest.raises(ValueError):
+        sqlite_anyio.SQLitePool(str(tmp_path / "pool.db"), readers=-1)
+    with pytest.raises(ValueError):
+        sqlite_anyio.SQLitePool(str(tmp_path / "pool.db"), readers=0, writer=False)
+
+    async with sqlite_anyio.SQLitePool(str(tmp_path / "pool.db"), readers=1) as pool:
+        with pytest.raises(RuntimeError):
+            await pool.open()
+
+    connections = []
+
+    def setup(connection):
+        if connections:
+            raise RuntimeError("foo")
+        connections.append(connection)
+
+    pool = sqlite_anyio.SQLitePool(str(tmp_path / "pool.db"), readers=1, setup=setup)
+    with pytest.raises(RuntimeError):
+        await pool.open()
+    with pytest.raises(sqlite3.ProgrammingError):
+        connections[0].cursor()
+
+
+async def test_pool_rollback_on_cancel(tmp_path):
+    async with sqlite_anyio.SQLitePool(str(tmp_path / "pool.db"), readers=0) as pool:
+        async with pool.acquire(readonly=False) as acon:
+            await acon.execute("CREATE TABLE lang(name)")
+            await acon.commit()
+
+        with anyio.move_on_after(0.05) as scope:
+            async with pool.acquire(readonly=False) as acon:
+                await acon.execute("INSERT INTO lang VALUES(?)", ("Python",))
+                await anyio.sleep(1)
+        assert scope.cancelled_caught
+
+        async with pool.acquire(readonly=False) as acon:
+            assert not acon._real_connection.in_transaction
+            assert await acon.execute_fetchall("SELECT name FROM lang") == []
+
+
+async def test_pool_replace_broken_connection(tmp_path):
+    async with sqlite_anyio.SQLitePool(str(tmp_path / "pool.db"), readers=0) as pool:
+        async with pool.acquire(readonly=False) as acon:
+            await acon.execute("CREATE TABLE lang(name)")
+            await acon.commit()
+
+        async def failing_rollback():
+            raise sqlite3.OperationalError("foo")
+
+        async with pool.acquire(readonly=False) as acon0:
+            await acon0.execute("INSERT INTO lang VALUES(?)", ("Python",))
+            acon0.rollback = failing_rollback
+
+        with pytest.raises(sqlite3.ProgrammingError):
+            acon0._real_connection.cursor()
+        async with pool.acquire(readonly=False) as acon1:
+            assert acon1 is not acon0
+            assert not acon1._real_connection.in_transaction
+            assert await acon1.execute_fetchall("SELECT name FROM lang") == []
+
+
+async def test_pool_reconnect_failure_keeps_slot(tmp_path):
+    fail_setup = False
+
+    def setup(connection):
+        if fail_setup:
+            raise RuntimeError("foo")
+
+    async def failing_rollback():
+        raise sqlite3.OperationalError("foo")
+
+    async with sqlite_anyio.SQLitePool(str(tmp_path / "pool.db"), readers=0, setup=setup) as pool:
+        async with pool.acquire(readonly=False) as acon0:
+            await acon0.execute("CREATE TABLE lang(name)")
+            await acon0.commit()
+            await acon0.execute("INSERT INTO lang VALUES(?)", ("Python",))
+            acon0.rollback = failing_rollback
+
+        fail_setup = True
+        for _ in range(2):
+            with anyio.fail_after(1), pytest.raises(RuntimeError):
+                async with pool.acquire(readonly=False):
+                    pass  # pragma: no cover
+
+        fail_setup = False
+        with anyio.fail_after(1):
+            async with pool.acquire(readonly=False) as acon1:
+                assert acon1 is not acon0
+                assert await acon1.execute_fetchall("SELECT name FROM lang") == []
+
+
+async def test_pool_close_while_waiting(tmp_path):
+    pool = await sqlite_anyio.create_pool(str(tmp_path / "pool.db"), readers=0)
+    errors = []
+
+    async def wait_for_writer():
+        try:
+            async with pool.acquire(readonly=False):
+                pass  # pragma: no cover
+        except RuntimeError as exception:
+            errors.append(str(exception))
+
+    async with anyio.create_task_group() as tg:
+        async with pool.acquire(readonly=False):
+            tg.start_soon(wait_for_writer)
+            await anyio.sleep(0.01)
+            await pool.close()
+
+    assert errors == ["the pool is not open"]
+
+
+async def test_pool_close_while_reconnecting(tmp_path):
+    slow_setup = False
+
+    def setup(connection):
+        if slow_setup:
+            time.sleep(0.1)
+
+    async def failing_rollback():
+        raise sqlite3.OperationalError("foo")
+
+    pool = await sqlite_anyio.create_pool(str(tmp_path / "pool.db"), readers=0, setup=setup)
+    async with pool.acquire(readonly=False) as acon:
+        await acon.execute("CREATE TABLE lang(name)")
+        await acon.commit()
+        await acon.execute("INSERT INTO lang VALUES(?)", ("Python",))
+        acon.rollback = failing_rollback
+
+    slow_setup = True
+    errors = []
+
+    async def reconnect():
+        try:
+            async with pool.acquire(readonly=False):
+                pass  # pragma: no cover
+        except RuntimeError as exception:
+            errors.append(str(exception))
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(reconnect)
+        await anyio.sleep(0.05)
+        await pool.close()
+
+    assert errors == ["the pool is not open"]
+    assert pool._connections == []